@@ -3,6 +3,7 @@ GitBook Scraper - A tool to scrape and structure GitBook documentation.
 """
 
 from .scraper import GitbookScraper
+from .nav import NavNode
 from .exceptions import (
     GitbookScraperError,
     NavigationExtractionError,
@@ -17,6 +18,7 @@ __email__ = "cigarette@keemail.com"
 
 __all__ = [
     'GitbookScraper',
+    'NavNode',
     'GitbookScraperError',
     'NavigationExtractionError',
     'ContentExtractionError',
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Page bodies are stored zstd-compressed when zstandard is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# zstd level for cached bodies; fast to write and quick to decompress
+ZSTD_LEVEL = 3
+
+# Errors that make a cached body unreadable
+_READ_ERRORS = (OSError, zstandard.ZstdError) if zstandard is not None else (OSError,)
+
+
+def _dumps(obj) -> bytes:
+    """Serialize cache metadata to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+class HTTPCache:
+    """On-disk cache of page bodies keyed by URL, with their HTTP validators."""
+
+    def __init__(self, directory: str):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory holding cached pages; created if missing
+        """
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        """Return the metadata and body paths for a URL."""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html"
+
+    def _load_meta(self, url: str) -> Optional[Dict]:
+        meta_path, _ = self._paths(url)
+        try:
+            meta = (orjson or json).loads(meta_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.debug(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+        if meta.get('url') != url:
+            return None
+        if meta.get('compression') == 'zstd' and zstandard is None:
+            logging.debug(f"Ignoring zstd-compressed cache entry for {url}: zstandard is not installed")
+            return None
+        return meta
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers for a cached URL."""
+        meta = self._load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return the cached body and its declared charset, or None on a miss."""
+        meta = self._load_meta(url)
+        if not meta:
+            return None
+        _, body_path = self._paths(url)
+        try:
+            body = body_path.read_bytes()
+            if meta.get('compression') == 'zstd':
+                body = zstandard.decompress(body)
+            return body, meta.get('encoding')
+        except _READ_ERRORS as e:
+            logging.debug(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def store(self, url: str, headers, body: bytes, encoding: Optional[str] = None) -> None:
+        """Cache a response body if the server sent an ETag or Last-Modified validator."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'encoding': encoding
+        }
+        if zstandard is not None:
+            body = zstandard.compress(body, ZSTD_LEVEL)
+            meta['compression'] = 'zstd'
+        try:
+            # Write the body before the metadata so a reader never sees
+            # validators for a body that is not on disk yet
+            self._write_atomic(body_path, body)
+            self._write_atomic(meta_path, _dumps(meta))
+        except OSError as e:
+            logging.warning(f"Failed to cache {url}: {e}")
+
+    def discard(self, url: str) -> None:
+        """Remove a cached URL so its validators are no longer sent."""
+        # Remove the metadata first so a reader never sees validators for a
+        # body that is already gone
+        for path in self._paths(url):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Failed to remove cache entry for {url}: {e}")
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
@@ -4,7 +4,7 @@ from rich.console import Console
 from rich.traceback import install
 from typing import Optional
 from .scraper import GitbookScraper
-from .exceptions import NavigationExtractionError, ContentExtractionError
+from .exceptions import NavigationExtractionError, ContentExtractionError, RateLimitError
 import urllib.parse
 
 install(show_locals=True)
@@ -17,7 +17,7 @@ console = Console()
 @click.option('--toc/--no-toc', default=False,
               help='Generate table of contents [default: False]')
 @click.option('--delay', default=0.5, type=float,
-              help='Delay between requests in seconds [default: 0.5]')
+              help='Sustained delay between requests in seconds [default: 0.5]')
 @click.option('--retries', default=3, type=int,
               help='Number of retries for failed requests [default: 3]')
 @click.option('--timeout', default=10, type=int,
@@ -28,8 +28,17 @@ console = Console()
               help='Path to JSON file with custom CSS selectors')
 @click.option('--toc-items', '-t', multiple=True,
               help='Specific TOC items to extract (can be specified multiple times)')
+@click.option('--concurrency', default=8, type=click.IntRange(min=1),
+              help='Maximum number of pages downloaded in parallel [default: 8]')
+@click.option('--burst', default=5, type=click.IntRange(min=1),
+              help='Requests allowed back-to-back before --delay applies [default: 5]')
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help='Directory for caching pages between runs (unchanged pages are not re-downloaded)')
+@click.option('--parse-workers', default=0, type=click.IntRange(min=0),
+              help='Processes converting pages to markdown; 0 converts on the download threads [default: 0]')
 def main(url: str, output: str, toc: bool, delay: float, retries: int,
-         timeout: int, debug: bool, selector_file: Optional[str], toc_items: tuple) -> int:
+         timeout: int, debug: bool, selector_file: Optional[str], toc_items: tuple,
+         concurrency: int, burst: int, cache_dir: Optional[str], parse_workers: int) -> int:
     """Scrape and structure GitBook documentation into a single markdown file."""
     try:
         # Validate URL
@@ -46,7 +55,11 @@ def main(url: str, output: str, toc: bool, delay: float, retries: int,
             timeout=timeout,
             debug=debug,
             selector_file=selector_file,
-            toc_items=list(toc_items) if toc_items else None
+            toc_items=list(toc_items) if toc_items else None,
+            concurrency=concurrency,
+            burst=burst,
+            cache_dir=cache_dir,
+            parse_workers=parse_workers
         )
         
         with console.status("[bold green]Scraping documentation..."):
@@ -55,7 +68,7 @@ def main(url: str, output: str, toc: bool, delay: float, retries: int,
         console.print(f"\n[bold green]✓[/] Documentation saved to: {output}")
         return 0
         
-    except (NavigationExtractionError, ContentExtractionError) as e:
+    except (NavigationExtractionError, ContentExtractionError, RateLimitError) as e:
         console.print(f"\n[bold red]Error:[/] {str(e)}")
         if debug:
             console.print_exception()
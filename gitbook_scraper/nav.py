@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+
+class NavNode:
+    """
+    One entry of a GitBook navigation hierarchy.
+
+    A slotted object is far smaller than the equivalent dict, which adds up on
+    navs with thousands of entries. Fields can also be read and written with
+    subscripts (``node['title']``), so code written against plain dict entries
+    keeps working with either.
+    """
+
+    __slots__ = ('title', 'slug', 'url', 'level', 'children')
+
+    def __init__(self, title: str, url: Optional[str], level: int,
+                 children: Optional[List['NavNode']] = None, slug: str = ''):
+        """
+        Initialize the node.
+
+        Args:
+            title: Link text shown in the navigation
+            url: Normalized page URL, or None for a heading without a page
+            level: Nesting depth of the entry's list item
+            children: Nested entries, in document order
+            slug: Anchor for the entry's heading in the generated document
+        """
+        self.title = title
+        self.slug = slug
+        self.url = url
+        self.level = level
+        self.children = [] if children is None else children
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def copy(self) -> 'NavNode':
+        """Return a shallow copy sharing the children list."""
+        return NavNode(self.title, self.url, self.level, self.children, self.slug)
+
+    def to_dict(self) -> Dict:
+        """Convert the node and its descendants to plain dicts."""
+        return {
+            'title': self.title,
+            'slug': self.slug,
+            'url': self.url,
+            'level': self.level,
+            'children': [child.to_dict() for child in self.children]
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, NavNode):
+            return NotImplemented
+        return (self.title, self.slug, self.url, self.level, self.children) == \
+            (other.title, other.slug, other.url, other.level, other.children)
+
+    def __repr__(self) -> str:
+        return (f"NavNode(title={self.title!r}, url={self.url!r}, level={self.level}, "
+                f"children={len(self.children)})")
+
+
+# A navigation hierarchy as built by the scraper, or as equivalent plain dicts
+NavStructure = Sequence[Union[NavNode, Dict]]
@@ -0,0 +1,39 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter allowing short bursts."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'last_ns', '_lock')
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Tokens refilled per second. A rate of 0 disables limiting.
+            capacity: Maximum number of tokens, i.e. the allowed burst size
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.last_ns = time.monotonic_ns()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, sleeping until one becomes available."""
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            # Integer nanosecond timestamps keep the elapsed time exact
+            now = time.monotonic_ns()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_ns) * self.rate / 1e9)
+            self.last_ns = now
+            # Reserve the token up front so concurrent callers queue behind us
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            self.tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
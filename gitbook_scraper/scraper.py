@@ -1,14 +1,937 @@
 #!/usr/bin/env python3
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, urlunparse
-from typing import Set, List, Dict, Optional
+import soupsieve
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.util import make_headers
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+from urllib.parse import urljoin, urlparse, urlsplit, urlunparse
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Set, List, Dict, Iterator, Optional, Sequence, Tuple
 import logging
+import multiprocessing
+import random
+import re
 import time
+from functools import lru_cache
+from itertools import chain
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import json
-from .exceptions import NavigationExtractionError, ContentExtractionError
+from io import BytesIO
+from .exceptions import NavigationExtractionError, ContentExtractionError, RateLimitError
+from .cache import HTTPCache
+from .nav import NavNode, NavStructure
+from .ratelimit import TokenBucket
+
+# Prefer the C-backed lxml parser; fall back to the stdlib parser when lxml
+# is not installed.
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Pages are converted directly on lxml trees when lxml and cssselect (used to
+# translate the CSS selectors) are available, and through BeautifulSoup
+# otherwise.
+try:
+    import cssselect
+    from lxml.cssselect import CSSSelector, LxmlHTMLTranslator
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Selector files are decoded with orjson when the speedups extra is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Content codings urllib3 can decode here: gzip and deflate, plus br and zstd
+# when their decoders are installed (zstd comes with the speedups extra)
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+# Upper bound in seconds for a single retry backoff
+MAX_BACKOFF = 60.0
+
+# Content selectors tried before the configured ones, in priority order
+CONTENT_SELECTORS = (
+    'main article',
+    'main',
+    'article',
+    'div[class*="page-inner"]',
+    'div[class*="content"]'
+)
+
+# Tags whose subtrees are parsed first when looking for navigation and content
+NAV_STRAIN_TAGS = ('nav',)
+CONTENT_STRAIN_TAGS = ('main', 'article')
+
+# Selectors rooted at a tag name, optionally narrowed by class/id/attribute
+# filters, and descending only through simple type/class/id steps; these
+# match identically within a strained subtree, and depend only on an element
+# and its ancestors, so a streaming parse can decide them at each start tag.
+_STRAINABLE_SELECTOR = re.compile(
+    r'\s*([a-z][a-z0-9]*)(?:[.#][\w-]+|\[[^\]]*\])*(?:(?:\s*>\s*|\s+)[\w.#-]+)*\s*')
+
+# Pages larger than this (in bytes) are converted with a streaming parse so
+# only one top-level content block is held as a tree at a time
+STREAM_PARSE_THRESHOLD = 512 * 1024
+
+_MULTI_NL = re.compile(r'\n{3,}')
+_TRAIL_WS = re.compile(r'[ \t]+\n')
+
+# Whitespace and control characters urlsplit strips or drops, and the empty
+# params, queries or fragments urlunparse drops, in a URL reference
+_URL_NEEDS_JOIN = re.compile(r'[\x00-\x20\x7f]|[?#](?:[?#]|$)|;(?=[?#]|$)')
+# Start of an absolute http(s) URL with a non-empty host
+_ABSOLUTE_HTTP_URL = re.compile(r'https?://[^/?#]')
+
+# Characters dropped when turning a heading into a GitHub-style anchor
+_SLUG_STRIP = re.compile(r'[^\w\- ]')
+
+# Start of a comment or <script> element, and the end of a <script> element,
+# in raw markup
+_SCRIPT_OPEN = re.compile(rb'<!--|<script[\s/>]', re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(rb'</script[^>]*>', re.IGNORECASE)
+
+_XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+_CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?([^"\';\s]+)', re.IGNORECASE)
+
+
+def _strip_scripts(body: bytes) -> bytes:
+    """
+    Cut ``<script>`` elements out of raw markup before it is parsed.
+
+    Scripts never contribute to the output, and on GitBook pages inline
+    hydration data often outweighs the visible content. Comments are
+    skipped over so a ``<script`` inside one is left alone.
+    """
+    pieces = []
+    pos = 0
+    while True:
+        match = _SCRIPT_OPEN.search(body, pos)
+        if not match:
+            break
+        if match.group() == b'<!--':
+            end = body.find(b'-->', match.end())
+            if end < 0:
+                break
+            pieces.append(body[pos:end + 3])
+            pos = end + 3
+            continue
+        close = _SCRIPT_CLOSE.search(body, match.end())
+        if not close:
+            break
+        pieces.append(body[pos:match.start()])
+        pos = close.end()
+
+    if not pieces:
+        return body
+    pieces.append(body[pos:])
+    return b''.join(pieces)
+
+
+def _declared_charset(response) -> Optional[str]:
+    """Return the charset declared in the Content-Type header, if any."""
+    match = _CHARSET_PARAM.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+
+def _decode_markup(body: bytes, encoding: Optional[str]) -> str:
+    """
+    Decode a downloaded page once, for whichever parser walks it.
+
+    A charset declared by the server wins. Otherwise bytes that are valid
+    UTF-8 (with or without a BOM) are taken as UTF-8, which skips
+    BeautifulSoup's statistical sniffing for nearly every page; anything else
+    goes through ``UnicodeDammit`` for BOM/meta/charset detection.
+    """
+    if encoding is None:
+        try:
+            return body.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            pass
+    return UnicodeDammit(body, [encoding] if encoding else [], is_html=True).unicode_markup or ''
+
+
+def _stream_source(body: bytes, encoding: Optional[str]) -> Tuple[bytes, str]:
+    """
+    Return page bytes and the encoding a streaming parse should read them with.
+
+    The encoding is chosen as in ``_decode_markup``, but the original bytes
+    are kept so a large page is not held again as text. Pages whose encoding
+    libxml2 does not know, or that only decode with replacement characters,
+    are transcoded to UTF-8.
+    """
+    if encoding is None:
+        try:
+            body.decode('utf-8')
+            return body, 'utf-8'
+        except UnicodeDecodeError:
+            pass
+    dammit = UnicodeDammit(body, [encoding] if encoding else [], is_html=True)
+    if dammit.original_encoding and not dammit.contains_replacement_characters:
+        try:
+            etree.HTMLParser(encoding=dammit.original_encoding)
+            return body, dammit.original_encoding
+        except LookupError:
+            pass
+    return (dammit.unicode_markup or '').encode('utf-8'), 'utf-8'
+
+
+def _strainable_count(selectors: Sequence[soupsieve.SoupSieve], tags: Sequence[str]) -> int:
+    """Count the leading selectors that can be answered from strained subtrees."""
+    count = 0
+    for selector in selectors:
+        match = _STRAINABLE_SELECTOR.fullmatch(selector.pattern)
+        if not match or match.group(1) not in tags:
+            break
+        count += 1
+    return count
+
+
+@lru_cache(maxsize=256)
+def _compiled(pattern: str) -> soupsieve.SoupSieve:
+    """Compile a CSS selector for BeautifulSoup trees, once per process."""
+    return soupsieve.compile(pattern)
+
+
+@lru_cache(maxsize=64)
+def _compound_selector(patterns: Tuple[str, ...]) -> soupsieve.SoupSieve:
+    """Compile several selectors into one comma-separated selector."""
+    return soupsieve.compile(', '.join(patterns))
+
+
+def _first_by_priority(soup: BeautifulSoup, selectors: Sequence[soupsieve.SoupSieve]):
+    """Return the first element matched by the highest-priority matching selector."""
+    if len(selectors) <= 1:
+        return selectors[0].select_one(soup) if selectors else None
+
+    # A single traversal collects every candidate in document order; the
+    # selector priority is then resolved against that short list
+    candidates = _compound_selector(tuple(selector.pattern for selector in selectors)).select(soup)
+    for selector in selectors:
+        for element in candidates:
+            if selector.match(element):
+                logging.debug(f"Found element using selector: {selector.pattern}")
+                return element
+    return None
+
+
+def _select_first(markup: str, selectors: Sequence[soupsieve.SoupSieve],
+                  strain_tags: Sequence[str]) -> Tuple[BeautifulSoup, Optional[object]]:
+    """
+    Parse a page and return the element matched by the first matching
+    precompiled selector.
+
+    Only the ``strain_tags`` subtrees are parsed at first; the full document is
+    parsed only when none of the leading selectors answerable from those
+    subtrees match. Returns the last parsed soup together with the match.
+    """
+    strained = _strainable_count(selectors, strain_tags)
+    if strained:
+        soup = BeautifulSoup(markup, HTML_PARSER, parse_only=SoupStrainer(list(strain_tags)))
+        element = _first_by_priority(soup, selectors[:strained])
+        if element:
+            return soup, element
+
+    soup = BeautifulSoup(markup, HTML_PARSER)
+    return soup, _first_by_priority(soup, selectors[strained:])
+
+
+@lru_cache(maxsize=4096)
+def _normalize_url(url: str) -> str:
+    """Strip fragments and trailing slashes from a URL (memoized)."""
+    parsed = urlparse(url)
+    cleaned = urlunparse((
+        parsed.scheme,
+        parsed.netloc,
+        parsed.path.rstrip('/'),
+        parsed.params,
+        parsed.query,
+        ''
+    ))
+    return cleaned.rstrip('/')
+
+
+@lru_cache(maxsize=1024)
+def _url_bases(page_url: str) -> Optional[Tuple[str, str]]:
+    """
+    Return the origin and directory URL that relative references on a page
+    resolve against, or None when the page URL itself needs normalizing.
+    """
+    parts = urlsplit(page_url)
+    if _URL_NEEDS_JOIN.search(page_url) or '//' in parts.path or '/.' in parts.path:
+        return None
+    origin = f"{parts.scheme}://{parts.netloc}"
+    directory = origin + (parts.path[:parts.path.rfind('/') + 1] if parts.path else '/')
+    return origin, directory
+
+
+def _absolute_url(page_url: str, ref: str) -> str:
+    """
+    Resolve a link or image reference against the page it appears on.
+
+    Plain absolute-path and document-relative references are joined by
+    concatenating onto the page's cached origin or directory; anything that
+    ``urljoin`` would clean up or resolve (whitespace and control characters,
+    empty queries or fragments, dot or empty path segments, bare fragments or
+    queries, scheme-relative or other-scheme references) goes through
+    ``urljoin``.
+    """
+    if not _URL_NEEDS_JOIN.search(ref):
+        if _ABSOLUTE_HTTP_URL.match(ref):
+            return ref
+        path = ref.partition('#')[0].partition('?')[0]
+        if path and '//' not in path and '/.' not in '/' + path:
+            bases = _url_bases(page_url)
+            if bases is not None:
+                if path[0] == '/':
+                    return bases[0] + ref
+                if ':' not in path.split('/', 1)[0]:
+                    return bases[1] + ref
+    return urljoin(page_url, ref)
+
+
+@lru_cache(maxsize=4096)
+def _slug(title: str) -> str:
+    """Anchor slug for a heading, as GitHub renders it (memoized; nav titles repeat)."""
+    return _SLUG_STRIP.sub('', title.lower()).replace(' ', '-')
+
+
+def _process_nav_item(element, base_url: str, domain: str, seen: Set[int]) -> List[NavNode]:
+    """Build nav entries for the list items under ``element``.
+
+    ``seen`` holds ids of list items already processed, so overlapping
+    subtrees are only walked once.
+    """
+    items = []
+
+    # First, handle links in list items
+    for li in element.find_all('li', recursive=False):
+        if id(li) in seen:
+            continue
+        seen.add(id(li))
+
+        link = li.find('a', href=True)  # Find first link in list item
+        if not link:
+            continue
+
+        href = link['href']
+        url = _absolute_url(base_url, href)
+        url = _normalize_url(url)
+
+        if urlsplit(url).netloc == domain:
+            title = link.get_text(strip=True)
+            item = NavNode(title, url, len(li.find_parents('ul')), slug=_slug(title))
+
+            # Process any nested lists in this list item
+            nested_ul = li.find('ul')
+            if nested_ul:
+                item.children.extend(_process_nav_item(nested_ul, base_url, domain, seen))
+
+            items.append(item)
+            logging.debug(f"Added nav item: {title} -> {url}")
+
+    return items
+
+
+def _render_image(element, page_url: str) -> str:
+    """Render an image, flagging GitBook-hosted images that need authentication."""
+    img_src = element.get('src', '')
+    img_alt = element.get('alt', '')
+    if not img_src:
+        return ''
+    img_src = _absolute_url(page_url, img_src)
+    # Add warning about image access if it's a GitBook URL
+    if 'gitbook.io' in img_src:
+        return f"\n\n> [!NOTE] Image: {img_alt}\n> Original URL: {img_src}\n> (Note: This image requires authentication)\n\n"
+    return f"\n\n![{img_alt}]({img_src})\n\n"
+
+
+def _render_leaf(element, page_url: str) -> str:
+    """Render an element other than a paragraph or div container."""
+    if element.name == 'img':
+        return _render_image(element, page_url)
+
+    elif element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+        level = int(element.name[1])
+        return f"\n\n{'#' * level} {element.get_text(strip=True)}\n\n"
+
+    elif element.name == 'code':
+        return f"`{element.get_text(strip=True)}`"
+
+    elif element.name == 'pre':
+        code = element.find('code')
+        if code:
+            lang = code.get('class', [''])[0].replace('language-', '') if code.get('class') else ''
+            return f"\n```{lang}\n{code.get_text(strip=True)}\n```\n"
+        return f"\n```\n{element.get_text(strip=True)}\n```\n"
+
+    elif element.name == 'ul':
+        items = []
+        for li in element.find_all('li', recursive=False):
+            items.append(f"* {_render_leaf(li, page_url)}")
+        return '\n' + '\n'.join(items) + '\n'
+
+    elif element.name == 'ol':
+        items = []
+        for i, li in enumerate(element.find_all('li', recursive=False), 1):
+            items.append(f"{i}. {_render_leaf(li, page_url)}")
+        return '\n' + '\n'.join(items) + '\n'
+
+    elif element.name == 'a':
+        href = element.get('href', '')
+        text = element.get_text(strip=True)
+        if href and text:
+            return f"[{text}]({_absolute_url(page_url, href)})"
+        return text
+
+    elif element.name == 'br':
+        return '\n'
+
+    elif element.name in ['table']:
+        rows = []
+        # Handle table headers
+        headers = element.find_all('th')
+        if headers:
+            header_row = [h.get_text(strip=True) for h in headers]
+            rows.append('| ' + ' | '.join(header_row) + ' |')
+            rows.append('| ' + ' | '.join(['---'] * len(header_row)) + ' |')
+
+        # Handle table rows
+        for tr in element.find_all('tr'):
+            cols = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
+            if cols:  # Skip empty rows
+                rows.append('| ' + ' | '.join(cols) + ' |')
+
+        return '\n' + '\n'.join(rows) + '\n'
+
+    # Default handling for other elements
+    text = element.get_text(' ', strip=True)
+    return text if text else ''
+
+
+def _process_element(element, page_url: str) -> str:
+    """Process individual elements maintaining proper spacing."""
+    if isinstance(element, str):
+        return element.strip()
+
+    if not hasattr(element, 'name'):
+        return ''
+
+    if element.name not in ['p', 'div']:
+        return _render_leaf(element, page_url)
+
+    # Walk nested paragraphs/divs with an explicit stack of
+    # (remaining children, rendered parts) frames so deeply
+    # nested content cannot exhaust the call stack
+    stack = [(iter(element.children), [])]
+    while True:
+        children, parts = stack[-1]
+        for child in children:
+            if isinstance(child, str):
+                text = child.strip()
+                if text:
+                    parts.append(text)
+            elif child.name == 'img':
+                parts.append(_render_image(child, page_url))
+            elif child.name in ['br']:
+                parts.append('\n')
+            elif child.name in ['p', 'div']:
+                stack.append((iter(child.children), []))
+                break
+            else:
+                parts.append(_render_leaf(child, page_url))
+        else:
+            stack.pop()
+            text = ' '.join(filter(None, parts))
+            if not stack:
+                return text
+            stack[-1][1].append(text)
+
+
+def _join_markdown(markdown_content: List[str]) -> str:
+    """Join rendered top-level fragments and clean up blank lines."""
+    # Drop trailing whitespace and collapse runs of blank lines into one
+    final_content = '\n'.join(markdown_content)
+    return _MULTI_NL.sub('\n\n', _TRAIL_WS.sub('\n', final_content)).strip()
+
+
+def _soup_html_to_md(url: str, body: bytes, encoding: Optional[str],
+                     selectors: Sequence[soupsieve.SoupSieve]) -> str:
+    """Convert a downloaded page to markdown by walking a BeautifulSoup tree."""
+    # Try multiple content selectors to find the main content
+    _, content = _select_first(_decode_markup(body, encoding), selectors, CONTENT_STRAIN_TAGS)
+    
+    if not content:
+        raise ContentExtractionError(f"No content found for {url}")
+
+    # Remove unnecessary elements
+    for element in content.find_all(['script', 'style', 'nav']):
+        element.decompose()
+    
+    # Process the entire content
+    markdown_content = []
+    for element in content.children:
+        processed = _process_element(element, url)
+        if processed:
+            markdown_content.append(processed)
+    
+    return _join_markdown(markdown_content)
+
+
+@lru_cache(maxsize=256)
+def _css_to_xpath(pattern: str) -> 'CSSSelector':
+    """Compile a CSS selector for lxml trees, once per process."""
+    return CSSSelector(pattern, translator='html')
+
+
+if HAS_LXML:
+    class _SelfMatchTranslator(LxmlHTMLTranslator):
+        """
+        Translate a selector into a test of the context element itself.
+
+        Descendant and child combinators become conditions on the element's
+        ancestors, so the test only needs the element and the path above it.
+        """
+
+        def xpath_descendant_combinator(self, left, right):
+            return right.add_condition(f'ancestor::{left}')
+
+        def xpath_child_combinator(self, left, right):
+            return right.add_condition(f'parent::{left}')
+
+
+@lru_cache(maxsize=256)
+def _css_self_test(pattern: str) -> 'etree.XPath':
+    """Compile a CSS selector into a boolean test of the context element, once per process."""
+    return etree.XPath(f"boolean({_SelfMatchTranslator().css_to_xpath(pattern, prefix='self::')})")
+
+
+@lru_cache(maxsize=256)
+def _subject_tag(pattern: str) -> Optional[str]:
+    """Tag name every element matched by ``pattern`` must have, if any."""
+    selectors = cssselect.parse(pattern)
+    if len(selectors) != 1:
+        return None
+    tree = selectors[0].parsed_tree
+    while isinstance(tree, cssselect.parser.CombinedSelector):
+        tree = tree.subselector
+    while not isinstance(tree, cssselect.parser.Element):
+        tree = getattr(tree, 'selector', None)
+        if tree is None:
+            return None
+    return tree.element if tree.element not in (None, '*') else None
+
+
+def _lx_text(element, separator: str = '') -> str:
+    """lxml counterpart of BeautifulSoup's ``get_text(separator, strip=True)``."""
+    return separator.join(filter(None, (text.strip() for text in element.itertext())))
+
+
+def _lx_children(element):
+    """Yield the text runs and child elements of an lxml element in document order."""
+    if element.text:
+        yield element.text
+    for child in element:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str):
+            yield child
+        if child.tail:
+            yield child.tail
+
+
+def _lx_heading(element, page_url: str) -> str:
+    level = int(element.tag[1])
+    return f"\n\n{'#' * level} {_lx_text(element)}\n\n"
+
+
+def _lx_code(element, page_url: str) -> str:
+    return f"`{_lx_text(element)}`"
+
+
+def _lx_pre(element, page_url: str) -> str:
+    code = element.find('.//code')
+    if code is not None:
+        classes = code.get('class', '').split()
+        lang = classes[0].replace('language-', '') if classes else ''
+        return f"\n```{lang}\n{_lx_text(code)}\n```\n"
+    return f"\n```\n{_lx_text(element)}\n```\n"
+
+
+def _lx_bullet_list(element, page_url: str) -> str:
+    items = [f"* {_lx_render_leaf(li, page_url)}" for li in element.findall('li')]
+    return '\n' + '\n'.join(items) + '\n'
+
+
+def _lx_numbered_list(element, page_url: str) -> str:
+    items = [f"{i}. {_lx_render_leaf(li, page_url)}" for i, li in enumerate(element.findall('li'), 1)]
+    return '\n' + '\n'.join(items) + '\n'
+
+
+def _lx_link(element, page_url: str) -> str:
+    href = element.get('href', '')
+    text = _lx_text(element)
+    if href and text:
+        return f"[{text}]({_absolute_url(page_url, href)})"
+    return text
+
+
+def _lx_table(element, page_url: str) -> str:
+    rows = []
+    # Handle table headers
+    header_row = [_lx_text(th) for th in element.iter('th')]
+    if header_row:
+        rows.append('| ' + ' | '.join(header_row) + ' |')
+        rows.append('| ' + ' | '.join(['---'] * len(header_row)) + ' |')
+
+    # Handle table rows
+    for tr in element.iter('tr'):
+        cols = [_lx_text(td) for td in tr.iter('td', 'th')]
+        if cols:  # Skip empty rows
+            rows.append('| ' + ' | '.join(cols) + ' |')
+
+    return '\n' + '\n'.join(rows) + '\n'
+
+
+def _lx_default(element, page_url: str) -> str:
+    return _lx_text(element, ' ')
+
+
+# Renderers for lxml elements other than paragraph/div containers, by tag
+_LX_RENDERERS = {
+    'img': _render_image,
+    **dict.fromkeys(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'), _lx_heading),
+    'code': _lx_code,
+    'pre': _lx_pre,
+    'ul': _lx_bullet_list,
+    'ol': _lx_numbered_list,
+    'a': _lx_link,
+    'br': lambda element, page_url: '\n',
+    'table': _lx_table,
+}
+
+
+def _lx_render_leaf(element, page_url: str) -> str:
+    """Render an lxml element other than a paragraph or div container."""
+    return _LX_RENDERERS.get(element.tag, _lx_default)(element, page_url)
+
+
+def _lx_process_element(element, page_url: str) -> str:
+    """lxml counterpart of ``_process_element``."""
+    if isinstance(element, str):
+        return element.strip()
+
+    if element.tag not in ('p', 'div'):
+        return _lx_render_leaf(element, page_url)
+
+    stack = [(_lx_children(element), [])]
+    while True:
+        children, parts = stack[-1]
+        for child in children:
+            if isinstance(child, str):
+                text = child.strip()
+                if text:
+                    parts.append(text)
+            elif child.tag == 'img':
+                parts.append(_render_image(child, page_url))
+            elif child.tag == 'br':
+                parts.append('\n')
+            elif child.tag in ('p', 'div'):
+                stack.append((_lx_children(child), []))
+                break
+            else:
+                parts.append(_lx_render_leaf(child, page_url))
+        else:
+            stack.pop()
+            text = ' '.join(filter(None, parts))
+            if not stack:
+                return text
+            stack[-1][1].append(text)
+
+
+def _lxml_parse(body: bytes, encoding: Optional[str]):
+    """Parse a downloaded page into an lxml tree, or return None if it is empty."""
+    markup = _decode_markup(body, encoding)
+    try:
+        # huge_tree lifts libxml2's nesting limit, which would otherwise
+        # silently drop deeply nested content
+        return lxml_html.document_fromstring(_XML_DECLARATION.sub('', markup, count=1),
+                                             parser=lxml_html.HTMLParser(huge_tree=True))
+    except etree.ParserError:
+        return None
+
+
+def _lx_first(tree, patterns: Sequence[str]):
+    """Return the first element matched by the highest-priority matching selector."""
+    for pattern in patterns:
+        matches = _css_to_xpath(pattern)(tree)
+        if matches:
+            logging.debug(f"Found element using selector: {pattern}")
+            return matches[0]
+    return None
+
+
+def _lxml_html_to_md(url: str, body: bytes, encoding: Optional[str],
+                     patterns: Sequence[str]) -> str:
+    """Convert a downloaded page to markdown by walking an lxml tree."""
+    tree = _lxml_parse(body, encoding)
+    # Try multiple content selectors to find the main content
+    content = _lx_first(tree, patterns) if tree is not None else None
+    if content is None:
+        raise ContentExtractionError(f"No content found for {url}")
+
+    # Remove unnecessary elements, keeping the text that follows them
+    etree.strip_elements(content, 'script', 'style', 'nav', with_tail=False)
+
+    markdown_content = []
+    for element in _lx_children(content):
+        processed = _lx_process_element(element, url)
+        if processed:
+            markdown_content.append(processed)
+
+    return _join_markdown(markdown_content)
+
+
+def _prune(element) -> None:
+    """Drop a finished element's subtree and its already finished siblings."""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _stream_events(data: bytes, encoding: str):
+    """Iterate start/end events of an HTML document held as bytes."""
+    return etree.iterparse(BytesIO(data), events=('start', 'end'), html=True, encoding=encoding,
+                           huge_tree=True, remove_comments=True, remove_pis=True)
+
+
+def _stream_find_content(data: bytes, encoding: str, patterns: Sequence[str]) -> Optional[int]:
+    """
+    Locate the content element without keeping the document in memory.
+
+    Returns the ordinal of the start event of the first element matched by
+    the highest-priority selector, or None when nothing matches. Each
+    element is tested against itself and its ancestors only, and only by
+    selectors that outrank the best match found so far.
+    """
+    selectors = [(_subject_tag(pattern), _css_self_test(pattern)) for pattern in patterns]
+    best = len(selectors)
+    found = None
+    ordinal = -1
+    for event, element in _stream_events(data, encoding):
+        if event == 'end':
+            _prune(element)
+            continue
+
+        ordinal += 1
+        for priority in range(best):
+            tag, matches = selectors[priority]
+            if (tag is None or tag == element.tag) and matches(element):
+                best, found = priority, ordinal
+                break
+        if best == 0:
+            break
+    return found
+
+
+def _append_md(markdown_content: List[str], node, page_url: str) -> None:
+    """Render a text run or lxml element and collect it if non-empty."""
+    processed = _lx_process_element(node, page_url) if node is not None else ''
+    if processed:
+        markdown_content.append(processed)
+
+
+def _flush_block(markdown_content: List[str], block, text: str, page_url: str) -> str:
+    """Render a finished top-level content block, returning the loose text that follows it."""
+    # Remove unnecessary elements, keeping the text that follows them
+    if block.tag in ('script', 'style', 'nav'):
+        return text + (block.tail or '')
+    etree.strip_elements(block, 'script', 'style', 'nav', with_tail=False)
+    _append_md(markdown_content, text, page_url)
+    _append_md(markdown_content, block, page_url)
+    return block.tail or ''
+
+
+def _iter_content_to_md(url: str, body: bytes, encoding: Optional[str],
+                        patterns: Sequence[str]) -> str:
+    """
+    Convert a very large page to markdown with ``etree.iterparse``.
+
+    The page is streamed twice: once to find the content element, then again
+    to render each of its top-level children as soon as it has been parsed.
+    Rendered blocks are cleared, so memory stays proportional to the largest
+    block rather than the page.
+    """
+    data, encoding = _stream_source(body, encoding)
+
+    target = _stream_find_content(data, encoding, patterns)
+    if target is None:
+        raise ContentExtractionError(f"No content found for {url}")
+
+    markdown_content: List[str] = []
+    content = None
+    pending = None
+    # Loose text waiting to be emitted; text around stripped elements is
+    # merged into one run, as etree.strip_elements does on the full tree
+    text = ''
+    ordinal = -1
+    for event, element in _stream_events(data, encoding):
+        if event == 'end':
+            if element is content:
+                break
+            if content is None:
+                _prune(element)
+            continue
+
+        ordinal += 1
+        if ordinal == target:
+            content = element
+        elif content is not None and element.getparent() is content:
+            # The previous top-level block and its tail are now complete
+            if pending is None:
+                text = content.text or ''
+            else:
+                text = _flush_block(markdown_content, pending, text, url)
+                content.remove(pending)
+            pending = element
+
+    if content is not None:
+        if pending is None:
+            text = content.text or ''
+        else:
+            text = _flush_block(markdown_content, pending, text, url)
+        _append_md(markdown_content, text, url)
+
+    return _join_markdown(markdown_content)
+
+
+def _html_to_md(url: str, body: bytes, encoding: Optional[str],
+                patterns: Sequence[str], use_lxml: bool = HAS_LXML) -> str:
+    """
+    Convert a downloaded page to markdown.
+
+    Kept at module level with explicit arguments so pages can be converted
+    in worker processes; selectors travel as plain strings and are compiled
+    at most once per process. ``use_lxml`` selects the lxml-native converter;
+    otherwise the page is walked with BeautifulSoup. With lxml, pages above
+    ``STREAM_PARSE_THRESHOLD`` bytes (after scripts are cut out) are
+    converted with a streaming parse, provided every selector can be decided
+    from an element and its ancestors alone.
+
+    Raises:
+        ContentExtractionError: If none of the content selectors match
+    """
+    body = _strip_scripts(body)
+    if use_lxml and len(body) > STREAM_PARSE_THRESHOLD and \
+            all(_STRAINABLE_SELECTOR.fullmatch(pattern) for pattern in patterns):
+        return _iter_content_to_md(url, body, encoding, patterns)
+    if use_lxml:
+        return _lxml_html_to_md(url, body, encoding, patterns)
+    return _soup_html_to_md(url, body, encoding, [_compiled(pattern) for pattern in patterns])
+
+
+if HAS_LXML:
+    # Hand-written XPath for the nav walk, compiled once and evaluated in C
+    _NAV_LINK = etree.XPath('descendant::a[@href][1]')
+    _NAV_SUBLIST = etree.XPath('descendant::ul[1]')
+    _NAV_LEVEL = etree.XPath('count(ancestor::ul)')
+
+
+def _lx_process_nav_item(element, base_url: str, domain: str, seen: Set) -> List[NavNode]:
+    """lxml counterpart of ``_process_nav_item``."""
+    items = []
+
+    for li in element.iterchildren('li'):
+        if li in seen:
+            continue
+        seen.add(li)
+
+        links = _NAV_LINK(li)  # Find first link in list item
+        if not links:
+            continue
+        link = links[0]
+
+        href = link.get('href')
+        url = _absolute_url(base_url, href)
+        url = _normalize_url(url)
+
+        if urlsplit(url).netloc == domain:
+            title = _lx_text(link)
+            item = NavNode(title, url, int(_NAV_LEVEL(li)), slug=_slug(title))
+
+            # Process any nested lists in this list item
+            nested_ul = _NAV_SUBLIST(li)
+            if nested_ul:
+                item.children.extend(_lx_process_nav_item(nested_ul[0], base_url, domain, seen))
+
+            items.append(item)
+            logging.debug(f"Added nav item: {title} -> {url}")
+
+    return items
+
+
+def _lxml_html_to_nav(body: bytes, encoding: Optional[str], patterns: Sequence[str],
+                      base_url: str, domain: str) -> List[NavNode]:
+    """Extract the navigation hierarchy by walking an lxml tree."""
+    tree = _lxml_parse(body, encoding)
+    if tree is None:
+        raise NavigationExtractionError("Could not find navigation structure")
+
+    nav = _lx_first(tree, patterns)
+    if nav is None:
+        logging.debug("Navigation element not found, trying fallback selectors")
+        nav = tree.find('.//nav')
+        if nav is None:
+            nav = next((div for div in tree.iter('div')
+                        if any(marker in div.get('class', '').lower() for marker in ('nav', 'sidebar'))),
+                       None)
+
+    if nav is None:
+        raise NavigationExtractionError("Could not find navigation structure")
+
+    ul = nav.find('.//ul')
+    return _lx_process_nav_item(nav if ul is None else ul, base_url, domain, set())
+
+
+def _soup_html_to_nav(body: bytes, encoding: Optional[str], selectors: Sequence[soupsieve.SoupSieve],
+                      base_url: str, domain: str) -> List[NavNode]:
+    """Extract the navigation hierarchy by walking a BeautifulSoup tree."""
+    soup, nav = _select_first(_decode_markup(body, encoding), selectors, NAV_STRAIN_TAGS)
+
+    if not nav:
+        logging.debug("Navigation element not found, trying fallback selectors")
+        nav = soup.find('nav') or soup.find('div', {'class': lambda x: x and ('nav' in x.lower() or 'sidebar' in x.lower())})
+
+    if not nav:
+        raise NavigationExtractionError("Could not find navigation structure")
+
+    return _process_nav_item(nav.find('ul') or nav, base_url, domain, set())
+
+
+def _html_to_nav(body: bytes, encoding: Optional[str], patterns: Sequence[str],
+                 base_url: str, domain: str, use_lxml: bool = HAS_LXML) -> List[NavNode]:
+    """
+    Extract the navigation hierarchy from the downloaded landing page.
+
+    Raises:
+        NavigationExtractionError: If no navigation element can be found
+    """
+    body = _strip_scripts(body)
+    if use_lxml:
+        return _lxml_html_to_nav(body, encoding, patterns, base_url, domain)
+    return _soup_html_to_nav(body, encoding, [_compiled(pattern) for pattern in patterns],
+                             base_url, domain)
+
 
 class GitbookScraper:
     """Main scraper class for GitBook documentation sites."""
@@ -23,7 +946,11 @@ class GitbookScraper:
         timeout: int = 10,
         debug: bool = False,
         selector_file: Optional[str] = None,
-        toc_items: Optional[List[str]] = None
+        toc_items: Optional[List[str]] = None,
+        concurrency: int = 8,
+        burst: int = 5,
+        cache_dir: Optional[str] = None,
+        parse_workers: int = 0
     ):
         """
         Initialize the GitBook scraper.
@@ -32,12 +959,18 @@ class GitbookScraper:
             base_url: Base URL of the GitBook site
             output_file: Path to output markdown file
             generate_toc: Whether to generate table of contents
-            delay: Delay between requests in seconds
+            delay: Sustained delay between requests in seconds
             retries: Number of retries for failed requests
             timeout: Request timeout in seconds
             debug: Enable debug logging
             selector_file: Optional JSON file with custom CSS selectors
             toc_items: Optional list of TOC item titles to extract. If None, extracts all items.
+            concurrency: Maximum number of pages downloaded in parallel
+            burst: Number of requests allowed back-to-back before the delay applies
+            cache_dir: Optional directory for caching pages between runs. Cached
+                pages are revalidated with conditional requests.
+            parse_workers: Number of processes converting downloaded pages to
+                markdown. 0 converts pages on the download threads.
         """
         self.base_url = self.normalize_url(base_url)
         self.domain = urlparse(self.base_url).netloc
@@ -47,6 +980,12 @@ class GitbookScraper:
         self.retries = retries
         self.timeout = timeout
         self.toc_items = set(toc_items) if toc_items else None
+        self.concurrency = max(1, concurrency)
+        self.parse_workers = max(0, parse_workers)
+        # Convert pages on lxml trees when available; set to False to force
+        # the BeautifulSoup converter
+        self.use_lxml = HAS_LXML
+        self._limiter = TokenBucket(rate=1 / delay if delay > 0 else 0, capacity=burst)
         
         # Setup logging
         log_level = logging.DEBUG if debug else logging.INFO
@@ -56,30 +995,43 @@ class GitbookScraper:
         # Initialize session and state
         self.session = requests.Session()
         self.visited_urls: Set[str] = set()
-        self.nav_structure: List[Dict] = []
+        self.nav_structure: NavStructure = []
         self.content_cache: Dict[str, str] = {}
+        self.failed_urls: Set[str] = set()
+        self.http_cache = HTTPCache(cache_dir) if cache_dir else None
         
         # Load custom selectors if provided
         self.selectors = self.load_selectors(selector_file)
+        self._nav_selectors = tuple(self.selectors['nav'])
+        self._content_selectors = (*CONTENT_SELECTORS, *self.selectors['content'])
+        # Compile selectors up front so invalid ones fail here, not per page;
+        # later lookups hit the per-process cache
+        for pattern in (*self._nav_selectors, *self._content_selectors):
+            _compiled(pattern)
+        # Selectors soupsieve accepts but cssselect cannot translate (such as
+        # :-soup-contains()) would fail on every page with lxml, so walk
+        # BeautifulSoup trees instead
+        if self.use_lxml:
+            try:
+                for pattern in (*self._nav_selectors, *self._content_selectors):
+                    _css_to_xpath(pattern)
+            except cssselect.SelectorError as e:
+                logging.warning(f"Selector not supported by lxml, parsing with BeautifulSoup: {e}")
+                self.use_lxml = False
         
-        # Setup session
+        # Setup session; keep one pooled keep-alive connection per worker
+        adapter = HTTPAdapter(pool_maxsize=max(DEFAULT_POOLSIZE, self.concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
+            'Accept-Encoding': ACCEPT_ENCODING,
             'User-Agent': self.get_user_agent()
         })
 
     @staticmethod
     def normalize_url(url: str) -> str:
         """Normalize URL to prevent duplicates."""
-        parsed = urlparse(url)
-        cleaned = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            parsed.path.rstrip('/'),
-            parsed.params,
-            parsed.query,
-            ''
-        ))
-        return cleaned.rstrip('/')
+        return _normalize_url(url)
 
     @staticmethod
     def load_selectors(selector_file: Optional[str]) -> Dict:
@@ -94,8 +1046,8 @@ class GitbookScraper:
             return default_selectors
             
         try:
-            with open(selector_file) as f:
-                custom_selectors = json.load(f)
+            with open(selector_file, 'rb') as f:
+                custom_selectors = (orjson or json).loads(f.read())
                 return {**default_selectors, **custom_selectors}
         except Exception as e:
             logging.warning(f"Failed to load custom selectors: {e}")
@@ -104,66 +1056,77 @@ class GitbookScraper:
     @staticmethod
     def get_user_agent() -> str:
         """Get user agent string from environment or use default."""
-        import os
         return os.getenv(
             'GITBOOK_SCRAPER_USER_AGENT',
             'GitBook Scraper/0.1.0 (https://github.com/yourusername/gitbook-scraper)'
         )
 
-    def extract_nav_structure(self) -> List[Dict]:
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds or as an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def _sleep_backoff(self, attempt: int, response=None) -> None:
+        """Sleep before a retry, honouring Retry-After or backing off exponentially with jitter."""
+        wait = None
+        if response is not None:
+            wait = self.parse_retry_after(response.headers.get('Retry-After'))
+        if wait is None:
+            wait = self.delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        time.sleep(min(wait, MAX_BACKOFF))
+
+    def _request(self, url: str):
+        """Issue a rate-limited GET, revalidating any cached copy of the page."""
+        headers = self.http_cache.conditional_headers(url) if self.http_cache else None
+        self._limiter.acquire()
+        return self.session.get(url, timeout=self.timeout, headers=headers)
+
+    def _read_body(self, url: str, response) -> Tuple[bytes, Optional[str]]:
+        """Return the page bytes and declared charset, serving 304s from the disk cache."""
+        if response.status_code == 304 and self.http_cache:
+            cached = self.http_cache.load(url)
+            if cached is not None:
+                logging.debug(f"Not modified, using cached copy of {url}")
+                return cached
+            # The validators outlived a missing or unreadable body; drop the
+            # entry and ask for a full copy instead
+            logging.debug(f"Cached copy of {url} is unreadable, fetching it again")
+            self.http_cache.discard(url)
+            response = self._request(url)
+        if response.status_code == 429:
+            raise RateLimitError(f"Rate limited while fetching {url}")
+        if response.status_code == 304:
+            raise ContentExtractionError(f"Cached copy of {url} is missing")
+        response.raise_for_status()
+
+        body, encoding = response.content, _declared_charset(response)
+        logging.debug(f"Fetched {url} ({len(body)} bytes, "
+                      f"Content-Encoding: {response.headers.get('Content-Encoding', 'identity')})")
+        if self.http_cache:
+            self.http_cache.store(url, response.headers, body, encoding)
+        return body, encoding
+
+    def extract_nav_structure(self) -> List[NavNode]:
         """Extract navigation structure from GitBook's sidebar."""
         for attempt in range(self.retries):
+            response = None
             try:
-                response = self.session.get(self.base_url, timeout=self.timeout)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Try different navigation selectors
-                nav = None
-                for selector in self.selectors['nav']:
-                    nav = soup.select_one(selector)
-                    if nav:
-                        logging.debug(f"Found navigation using selector: {selector}")
-                        break
-                
-                if not nav:
-                    logging.debug("Navigation element not found, trying fallback selectors")
-                    nav = soup.find('nav') or soup.find('div', {'class': lambda x: x and ('nav' in x.lower() or 'sidebar' in x.lower())})
-                
-                if not nav:
-                    raise NavigationExtractionError("Could not find navigation structure")
-
-                def process_nav_item(element) -> List[Dict]:
-                    items = []
-                    
-                    # First, handle links in list items
-                    for li in element.find_all('li', recursive=False):
-                        link = li.find('a', href=True)  # Find first link in list item
-                        if not link:
-                            continue
-                            
-                        href = link['href']
-                        url = urljoin(self.base_url, href) if not href.startswith(('http://', 'https://')) else href
-                        
-                        if urlparse(url).netloc == self.domain:
-                            item = {
-                                'title': link.get_text(strip=True),
-                                'url': self.normalize_url(url),
-                                'level': len(li.find_parents('ul')),
-                                'children': []
-                            }
-                            
-                            # Process any nested lists in this list item
-                            nested_ul = li.find('ul')
-                            if nested_ul:
-                                item['children'].extend(process_nav_item(nested_ul))
-                                
-                            items.append(item)
-                            logging.debug(f"Added nav item: {item['title']} -> {item['url']}")
-                    
-                    return items
-
-                nav_items = process_nav_item(nav.find('ul') or nav)
+                response = self._request(self.base_url)
+                body, encoding = self._read_body(self.base_url, response)
+                nav_items = _html_to_nav(body, encoding, self._nav_selectors,
+                                         self.base_url, self.domain, self.use_lxml)
                 if not nav_items:
                     logging.warning("No navigation items found")
                     continue
@@ -174,205 +1137,194 @@ class GitbookScraper:
             except Exception as e:
                 logging.error(f"Error extracting navigation: {str(e)}")
                 if attempt < self.retries - 1:
-                    time.sleep(self.delay * (attempt + 1))
+                    self._sleep_backoff(attempt, response)
+                elif isinstance(e, RateLimitError):
+                    raise
                 else:
                     raise NavigationExtractionError("Failed to extract navigation after retries")
 
-    def fetch_content(self, url: str) -> Optional[str]:
-        """Fetch and process content from a URL."""
-        if url in self.content_cache:
-            return self.content_cache[url]
-
+    def fetch_html(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Download a page with retries, returning its bytes and declared charset."""
         for attempt in range(self.retries):
+            response = None
             try:
-                response = self.session.get(url, timeout=self.timeout)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Try multiple content selectors to find the main content
-                content = None
-                for selector in [
-                    'main article',
-                    'main',
-                    'article',
-                    'div[class*="page-inner"]',
-                    'div[class*="content"]',
-                    *self.selectors['content']
-                ]:
-                    content = soup.select_one(selector)
-                    if content:
-                        logging.debug(f"Found content using selector: {selector}")
-                        break
-                
-                if not content:
-                    raise ContentExtractionError(f"No content found for {url}")
-
-                # Remove unnecessary elements
-                for element in content.find_all(['script', 'style', 'nav']):
-                    element.decompose()
-                
-                def process_element(element) -> str:
-                    """Process individual elements maintaining proper spacing."""
-                    if isinstance(element, str):
-                        return element.strip()
-                    
-                    if not hasattr(element, 'name'):
-                        return ''
-                    
-                    # Handle different types of elements
-                    if element.name == 'img':
-                        img_src = element.get('src', '')
-                        img_alt = element.get('alt', '')
-                        if img_src:
-                            if not img_src.startswith(('http://', 'https://')):
-                                img_src = urljoin(url, img_src)
-                            # Add warning about image access if it's a GitBook URL
-                            if 'gitbook.io' in img_src:
-                                return f"\n\n> [!NOTE] Image: {img_alt}\n> Original URL: {img_src}\n> (Note: This image requires authentication)\n\n"
-                            return f"\n\n![{img_alt}]({img_src})\n\n"
-                    
-                    elif element.name in ['p', 'div']:
-                        parts = []
-                        for child in element.children:
-                            if isinstance(child, str):
-                                text = child.strip()
-                                if text:
-                                    parts.append(text)
-                            elif child.name == 'img':
-                                img_src = child.get('src', '')
-                                img_alt = child.get('alt', '')
-                                if img_src:
-                                    if not img_src.startswith(('http://', 'https://')):
-                                        img_src = urljoin(url, img_src)
-                                    if 'gitbook.io' in img_src:
-                                        parts.append(f"\n\n> [!NOTE] Image: {img_alt}\n> Original URL: {img_src}\n> (Note: This image requires authentication)\n\n")
-                                    else:
-                                        parts.append(f"\n\n![{img_alt}]({img_src})\n\n")
-                            elif child.name in ['br']:
-                                parts.append('\n')
-                            else:
-                                parts.append(process_element(child))
-                        return ' '.join(filter(None, parts))
-                    
-                    elif element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                        level = int(element.name[1])
-                        return f"\n\n{'#' * level} {element.get_text(strip=True)}\n\n"
-                    
-                    elif element.name == 'code':
-                        return f"`{element.get_text(strip=True)}`"
-                    
-                    elif element.name == 'pre':
-                        code = element.find('code')
-                        if code:
-                            lang = code.get('class', [''])[0].replace('language-', '') if code.get('class') else ''
-                            return f"\n```{lang}\n{code.get_text(strip=True)}\n```\n"
-                        return f"\n```\n{element.get_text(strip=True)}\n```\n"
-                    
-                    elif element.name == 'ul':
-                        items = []
-                        for li in element.find_all('li', recursive=False):
-                            items.append(f"* {process_element(li)}")
-                        return '\n' + '\n'.join(items) + '\n'
-                    
-                    elif element.name == 'ol':
-                        items = []
-                        for i, li in enumerate(element.find_all('li', recursive=False), 1):
-                            items.append(f"{i}. {process_element(li)}")
-                        return '\n' + '\n'.join(items) + '\n'
-                    
-                    elif element.name == 'a':
-                        href = element.get('href', '')
-                        text = element.get_text(strip=True)
-                        if href and text:
-                            if not href.startswith(('http://', 'https://')):
-                                href = urljoin(url, href)
-                            return f"[{text}]({href})"
-                        return text
-                    
-                    elif element.name == 'br':
-                        return '\n'
-                    
-                    elif element.name in ['table']:
-                        rows = []
-                        # Handle table headers
-                        headers = element.find_all('th')
-                        if headers:
-                            header_row = [h.get_text(strip=True) for h in headers]
-                            rows.append('| ' + ' | '.join(header_row) + ' |')
-                            rows.append('| ' + ' | '.join(['---'] * len(header_row)) + ' |')
-                        
-                        # Handle table rows
-                        for tr in element.find_all('tr'):
-                            cols = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                            if cols:  # Skip empty rows
-                                rows.append('| ' + ' | '.join(cols) + ' |')
-                        
-                        return '\n' + '\n'.join(rows) + '\n'
-                    
-                    # Default handling for other elements
-                    text = element.get_text(' ', strip=True)
-                    return text if text else ''
-                
-                # Process the entire content
-                markdown_content = []
-                for element in content.children:
-                    processed = process_element(element)
-                    if processed:
-                        markdown_content.append(processed)
-                
-                # Clean up multiple newlines and spaces
-                final_content = '\n'.join(markdown_content)
-                final_content = '\n'.join(line for line in final_content.splitlines() if line.strip())
-                final_content = final_content.replace('\n\n\n\n', '\n\n')
-                
-                self.content_cache[url] = final_content
-                return final_content
-                
+                response = self._request(url)
+                return self._read_body(url, response)
             except Exception as e:
                 logging.error(f"Error fetching content from {url}: {e}")
                 if attempt < self.retries - 1:
-                    time.sleep(self.delay * (attempt + 1))
+                    self._sleep_backoff(attempt, response)
         
         return None
 
-    def generate_toc_md(self, structure: List[Dict], level: int = 0) -> str:
-        """Generate table of contents in markdown format."""
-        toc = []
-        for item in structure:
-            indent = "  " * level
-            toc.append(f"{indent}- [{item['title']}](#{item['title'].lower().replace(' ', '-')})")
+    def fetch_content(self, url: str) -> Optional[str]:
+        """Fetch and process content from a URL."""
+        # Key on the normalized URL so fragment or trailing-slash variants of
+        # a page cross-linked from several places are fetched only once
+        key = _normalize_url(url)
+        if key in self.content_cache:
+            return self.content_cache[key]
+
+        page = self.fetch_html(url)
+        if page is None:
+            return None
+
+        body, encoding = page
+        try:
+            final_content = _html_to_md(url, body, encoding, self._content_selectors, self.use_lxml)
+        except Exception as e:
+            logging.error(f"Error processing content from {url}: {e}")
+            return None
+
+        self.content_cache[key] = final_content
+        return final_content
+
+    @staticmethod
+    def collect_urls(structure: NavStructure) -> List[str]:
+        """Collect unique page URLs from the navigation hierarchy in document order."""
+        urls = []
+        seen = set()
+        stack = [iter(structure)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            if item['url'] and item['url'] not in seen:
+                seen.add(item['url'])
+                urls.append(item['url'])
             if item['children']:
-                toc.append(self.generate_toc_md(item['children'], level + 1))
-        return "\n".join(toc)
+                stack.append(iter(item['children']))
+        return urls
+
+    def _prefetch_one(self, url: str) -> None:
+        """Fetch a single page on a worker thread, recording failures."""
+        content = self.fetch_content(url)
+        if content is None:
+            self.failed_urls.add(url)
+        else:
+            self.content_cache[url] = content
+
+    def prefetch_content(self, urls: List[str]) -> None:
+        """Download pages in parallel, filling the content cache."""
+        pending = [url for url in urls
+                   if url not in self.content_cache and url not in self.failed_urls]
+        if not pending:
+            return
+
+        workers = min(self.concurrency, len(pending))
+        logging.debug(f"Prefetching {len(pending)} pages with {workers} workers")
+        if not self.parse_workers:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self._prefetch_one, pending))
+            return
+
+        # Download on threads and convert on processes to sidestep the GIL;
+        # each page is handed to a converter as soon as its download finishes,
+        # so parsing overlaps with the remaining downloads. Converters start
+        # lazily on the first submit, while download threads hold
+        # connection-pool, SSL and cache locks, so they are spawned rather
+        # than forked from this multi-threaded process
+        with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as parse_pool, \
+                ThreadPoolExecutor(max_workers=workers) as fetch_pool:
+            downloads = {fetch_pool.submit(self.fetch_html, url): url for url in pending}
+            conversions = {}
+            for download in as_completed(downloads):
+                url = downloads[download]
+                page = download.result()
+                if page is None:
+                    self.failed_urls.add(url)
+                    continue
+                conversions[url] = parse_pool.submit(_html_to_md, url, page[0], page[1],
+                                                     self._content_selectors, self.use_lxml)
+
+            for url, conversion in conversions.items():
+                try:
+                    self.content_cache[url] = conversion.result()
+                except Exception as e:
+                    logging.error(f"Error processing content from {url}: {e}")
+                    self.failed_urls.add(url)
+
+    def _emit_toc(self, structure: NavStructure, level: int, out: List[str]) -> None:
+        """Append table of contents lines, each ending in a newline, to ``out``."""
+        # Walk the tree depth-first with an explicit stack of sibling iterators
+        stack = [(iter(structure), level)]
+        while stack:
+            items, depth = stack[-1]
+            for item in items:
+                slug = item.get('slug') or _slug(item['title'])
+                out.append(f"{'  ' * depth}- [{item['title']}](#{slug})\n")
+                if item['children']:
+                    stack.append((iter(item['children']), depth + 1))
+                    break
+            else:
+                stack.pop()
+
+    def generate_toc_md(self, structure: NavStructure, level: int = 0) -> str:
+        """Generate table of contents in markdown format."""
+        toc: List[str] = []
+        self._emit_toc(structure, level, toc)
+        return ''.join(toc).rstrip('\n')
+
+    def _iter_markdown(self, structure: NavStructure, level: int) -> Iterator[str]:
+        """Yield markdown fragments for a navigation subtree, each ending in its separator."""
+        # Walk the tree depth-first with an explicit stack of sibling iterators;
+        # an item's separator follows the fragments of all its descendants
+        stack = [(iter(structure), level)]
+        while stack:
+            items, depth = stack[-1]
+            item = next(items, None)
+            if item is None:
+                stack.pop()
+                if stack:
+                    yield "\n---\n\n"
+                continue
+
+            yield f"{'#' * depth} {item['title']}\n\n"
 
-    def generate_markdown(self, structure: List[Dict], level: int = 1) -> str:
-        """Generate structured markdown from navigation hierarchy."""
-        content = []
-        
-        if self.generate_toc and level == 1:
-            content.append("# Table of Contents\n")
-            content.append(self.generate_toc_md(structure))
-            content.append("\n---\n")
-        
-        for item in structure:
-            header = '#' * level
-            content.append(f"{header} {item['title']}\n")
-            
             if item['url'] and item['url'] not in self.visited_urls:
                 self.visited_urls.add(item['url'])
-                page_content = self.fetch_content(item['url'])
+                page_content = self.content_cache.get(item['url'])
                 if page_content:
-                    content.append(page_content + "\n")
-                time.sleep(self.delay)
-            
+                    yield page_content
+                    yield "\n\n"
+
             if item['children']:
-                content.append(self.generate_markdown(item['children'], level + 1))
-            
-            content.append("\n---\n")
-        
-        return "\n".join(content)
+                stack.append((iter(item['children']), depth + 1))
+            else:
+                yield "\n---\n\n"
+
+    def iter_markdown(self, structure: NavStructure, level: int = 1) -> Iterator[str]:
+        """
+        Yield the structured markdown document in order, one fragment at a time.
 
-    def filter_nav_structure(self, structure: List[Dict]) -> List[Dict]:
+        Every page in ``structure`` is downloaded up front with
+        ``prefetch_content``, so assembling the document does no I/O.
+        """
+        self.prefetch_content(self.collect_urls(structure))
+
+        fragments: List[str] = []
+        if self.generate_toc and level == 1:
+            fragments.append("# Table of Contents\n\n")
+            self._emit_toc(structure, 0, fragments)
+            fragments.append("\n---\n\n")
+
+        # Hold each fragment back by one so the separator newline after the
+        # final fragment can be dropped
+        previous = None
+        for fragment in chain(fragments, self._iter_markdown(structure, level)):
+            if previous is not None:
+                yield previous
+            previous = fragment
+        if previous is not None:
+            yield previous[:-1]
+
+    def generate_markdown(self, structure: NavStructure, level: int = 1) -> str:
+        """Generate structured markdown from navigation hierarchy."""
+        return ''.join(self.iter_markdown(structure, level))
+
+    def filter_nav_structure(self, structure: NavStructure) -> NavStructure:
         """Filter navigation structure to only include specified TOC items and their children."""
         if not self.toc_items:
             return structure
@@ -408,12 +1360,21 @@ class GitbookScraper:
                     if not self.nav_structure:
                         raise NavigationExtractionError("No matching TOC items found")
                 
+                progress.add_task("Downloading pages...", total=None)
+                self.prefetch_content(self.collect_urls(self.nav_structure))
+
                 progress.add_task("Generating documentation...", total=None)
-                content = self.generate_markdown(self.nav_structure)
-                
                 self.output_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(self.output_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                # Stream fragments to a temporary file and move it into place,
+                # so a failed run never leaves a truncated document behind
+                partial_file = self.output_file.with_name(self.output_file.name + '.part')
+                try:
+                    with open(partial_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                        f.writelines(self.iter_markdown(self.nav_structure))
+                    os.replace(partial_file, self.output_file)
+                finally:
+                    if partial_file.exists():
+                        partial_file.unlink()
                 
                 logging.info(f"Documentation saved to {self.output_file}")
                 logging.info(f"Processed {len(self.visited_urls)} pages")
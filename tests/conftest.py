@@ -7,6 +7,8 @@ def mock_response():
     def _mock_response(content: str, status_code: int = 200):
         mock = Mock()
         mock.text = content
+        mock.content = content.encode('utf-8')
+        mock.headers = {}
         mock.status_code = status_code
         mock.url = "https://test.gitbook.io"
         def raise_for_status():
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import patch
+from gitbook_scraper.cache import HTTPCache, zstandard
+
+def test_store_and_load(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store("https://test.gitbook.io/page", {'ETag': '"abc"'}, b"<main>Hi</main>", 'utf-8')
+
+    assert cache.load("https://test.gitbook.io/page") == (b"<main>Hi</main>", 'utf-8')
+    assert cache.conditional_headers("https://test.gitbook.io/page") == {'If-None-Match': '"abc"'}
+
+def test_store_requires_validator(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store("https://test.gitbook.io/page", {}, b"<main>Hi</main>")
+
+    assert cache.load("https://test.gitbook.io/page") is None
+    assert cache.conditional_headers("https://test.gitbook.io/page") == {}
+
+def test_last_modified_header(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    cache.store("https://test.gitbook.io/page", {'Last-Modified': last_modified}, b"body")
+
+    assert cache.conditional_headers("https://test.gitbook.io/page") == {
+        'If-Modified-Since': last_modified
+    }
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store("https://test.gitbook.io/page", {'ETag': '"abc"'}, b"body")
+    meta_path, _ = cache._paths("https://test.gitbook.io/page")
+    meta_path.write_text("not json")
+
+    assert cache.load("https://test.gitbook.io/page") is None
+
+def test_store_and_load_without_orjson(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    with patch('gitbook_scraper.cache.orjson', None):
+        cache.store("https://test.gitbook.io/page", {'ETag': '"abc"'}, b"body", 'utf-8')
+        assert cache.load("https://test.gitbook.io/page") == (b"body", 'utf-8')
+
+    assert cache.load("https://test.gitbook.io/page") == (b"body", 'utf-8')
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_bodies_stored_compressed(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    body = b"<main>" + b"Hello " * 1000 + b"</main>"
+    cache.store("https://test.gitbook.io/page", {'ETag': '"abc"'}, body)
+    _, body_path = cache._paths("https://test.gitbook.io/page")
+
+    assert len(body_path.read_bytes()) < len(body)
+    assert cache.load("https://test.gitbook.io/page") == (body, None)
+
+    # Without a decompressor the entry is a miss, and no validators are sent
+    with patch('gitbook_scraper.cache.zstandard', None):
+        assert cache.load("https://test.gitbook.io/page") is None
+        assert cache.conditional_headers("https://test.gitbook.io/page") == {}
+
+def test_discard(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store("https://test.gitbook.io/page", {'ETag': '"abc"'}, b"body")
+    cache.discard("https://test.gitbook.io/page")
+    cache.discard("https://test.gitbook.io/page")
+
+    assert cache.load("https://test.gitbook.io/page") is None
+    assert cache.conditional_headers("https://test.gitbook.io/page") == {}
+    assert not list(tmp_path.iterdir())
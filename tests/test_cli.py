@@ -42,7 +42,12 @@ def test_cli_with_options(runner):
             retries=3,
             timeout=10,
             debug=True,
-            selector_file=None
+            selector_file=None,
+            toc_items=None,
+            concurrency=8,
+            burst=5,
+            cache_dir=None,
+            parse_workers=0
         )
 
 def test_cli_navigation_error(runner):
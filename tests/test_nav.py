@@ -0,0 +1,35 @@
+import pytest
+from gitbook_scraper import NavNode
+
+def test_subscript_access():
+    node = NavNode("Intro", "https://test.gitbook.io/intro", 1, slug="intro")
+
+    assert node['title'] == "Intro"
+    assert node['children'] == []
+    assert node.get('slug') == "intro"
+    assert node.get('missing') is None
+    with pytest.raises(KeyError):
+        node['missing']
+
+def test_copy_and_to_dict():
+    child = NavNode("Child", "https://test.gitbook.io/child", 2, slug="child")
+    node = NavNode("Intro", "https://test.gitbook.io/intro", 1, [child], slug="intro")
+
+    node_copy = node.copy()
+    node_copy['children'] = []
+
+    assert node.children == [child]
+    assert node_copy != node
+    assert node.to_dict() == {
+        'title': "Intro",
+        'slug': "intro",
+        'url': "https://test.gitbook.io/intro",
+        'level': 1,
+        'children': [{
+            'title': "Child",
+            'slug': "child",
+            'url': "https://test.gitbook.io/child",
+            'level': 2,
+            'children': []
+        }]
+    }
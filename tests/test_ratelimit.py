@@ -0,0 +1,25 @@
+from unittest.mock import patch
+from gitbook_scraper.ratelimit import TokenBucket
+
+def test_burst_does_not_sleep():
+    bucket = TokenBucket(rate=1.0, capacity=3)
+    with patch('gitbook_scraper.ratelimit.time.sleep') as mock_sleep:
+        for _ in range(3):
+            bucket.acquire()
+        mock_sleep.assert_not_called()
+
+def test_empty_bucket_waits_for_refill():
+    bucket = TokenBucket(rate=2.0, capacity=1)
+    with patch('gitbook_scraper.ratelimit.time.monotonic_ns', return_value=bucket.last_ns), \
+         patch('gitbook_scraper.ratelimit.time.sleep') as mock_sleep:
+        bucket.acquire()
+        bucket.acquire()
+        bucket.acquire()
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+
+def test_zero_rate_disables_limiting():
+    bucket = TokenBucket(rate=0)
+    with patch('gitbook_scraper.ratelimit.time.sleep') as mock_sleep:
+        for _ in range(10):
+            bucket.acquire()
+        mock_sleep.assert_not_called()
@@ -1,11 +1,17 @@
+import json
 import pytest
 from unittest.mock import Mock, patch
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ACCEPT_ENCODING
+from gitbook_scraper.scraper import HAS_LXML, _absolute_url
 from gitbook_scraper import (
     GitbookScraper,
     NavigationExtractionError,
-    ContentExtractionError
+    ContentExtractionError,
+    RateLimitError
 )
 
 @pytest.fixture
@@ -13,6 +19,8 @@ def mock_response():
     def _mock_response(content: str, status_code: int = 200):
         mock = Mock()
         mock.text = content
+        mock.content = content.encode('utf-8')
+        mock.headers = {}
         mock.status_code = status_code
         mock.url = "https://test.gitbook.io" 
         def raise_for_status():
@@ -63,6 +71,22 @@ def test_navigation_extraction(scraper, mock_response, sample_nav_html):
         assert nav[1]['children'][0]['title'] == "Getting Started"
         assert nav[1]['children'][0]['url'] == "https://test.gitbook.io/basics/getting-started"
 
+@pytest.mark.skipif(not HAS_LXML, reason="lxml and cssselect are required")
+def test_lxml_and_soup_nav_extraction_match(mock_response, sample_nav_html):
+    html = sample_nav_html + """
+    <div class="sidebar"><ul><li><a href="/other"><span>Other</span> page</a></li></ul></div>
+    """
+    results = []
+    for use_lxml in (True, False):
+        scraper = GitbookScraper("https://test.gitbook.io")
+        scraper.use_lxml = use_lxml
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value = mock_response(html)
+            results.append(scraper.extract_nav_structure())
+
+    assert results[0] == results[1]
+    assert results[0][1]['children'][0]['level'] == 2
+
 def test_navigation_extraction_failure(scraper, mock_response):
     with patch('requests.Session.get') as mock_get:
         mock_get.return_value = mock_response("<div>No nav here</div>")
@@ -116,6 +140,20 @@ def test_markdown_generation(scraper):
         assert "# Test Page" in content
         assert "Test content" in content
 
+def test_markdown_generation_deep_nav(scraper):
+    nav_structure = []
+    children = nav_structure
+    for depth in range(2000):
+        item = {'title': f'Level {depth}', 'url': None, 'level': depth + 1, 'children': []}
+        children.append(item)
+        children = item['children']
+
+    content = scraper.generate_markdown(nav_structure)
+    toc = scraper.generate_toc_md(nav_structure)
+
+    assert content.count("\n---\n") == 2000
+    assert toc.endswith(f"{'  ' * 1999}- [Level 1999](#level-1999)")
+
 def test_rate_limiting(scraper, mock_response):
     with patch('requests.Session.get') as mock_get:
         mock_get.return_value = mock_response("", 429)
@@ -145,6 +183,43 @@ def test_toc_generation(scraper):
     assert '- [Introduction](#introduction)' in toc
     assert '  - [Getting Started](#getting-started)' in toc
 
+def test_toc_slugs_match_github_anchors(scraper):
+    nav_structure = [
+        {
+            'title': 'API: Getting Started!',
+            'url': 'https://test.gitbook.io/api',
+            'level': 1,
+            'children': [
+                {'title': 'Step 1 - Install', 'url': None, 'level': 2, 'children': []}
+            ]
+        }
+    ]
+
+    toc = scraper.generate_toc_md(nav_structure)
+    assert toc == ("- [API: Getting Started!](#api-getting-started)\n"
+                   "  - [Step 1 - Install](#step-1---install)")
+
+@pytest.mark.parametrize("page_url", [
+    "https://test.gitbook.io", "https://test.gitbook.io/docs/page?x=1", "https://test.gitbook.io/a//b/../page",
+])
+@pytest.mark.parametrize("ref", [
+    "img.png", "/img.png", "//cdn.example.com/img.png", "../img.png", "./img.png",
+    "#section", "?q=1", "a/b/c.png", "mailto:team@example.com", "https://example.com/img.png",
+    " guide", "\n  /docs/intro\n", "\n pic.png", "a\tb", "x//y", "a/..", "img.png?", "https://example.com/a#",
+    "x;", "x;?q", ";", "https://", "https:///img.png",
+])
+def test_absolute_url_matches_urljoin(page_url, ref):
+    assert _absolute_url(page_url, ref) == urljoin(page_url, ref)
+
+def test_content_memoized_by_normalized_url(scraper, mock_response, sample_content_html):
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(sample_content_html)
+        first = scraper.fetch_content("https://test.gitbook.io/page")
+        second = scraper.fetch_content("https://test.gitbook.io/page/#section")
+
+        assert first == second
+        assert mock_get.call_count == 1
+
 def test_content_with_images(scraper, mock_response):
     """Test content extraction with images."""
     html_with_images = """
@@ -170,4 +245,341 @@ def test_content_with_images(scraper, mock_response):
         assert "Some text before image" in content
         assert "![Test Image](https://test.gitbook.io/images/test.png)" in content
         assert "![External Image](https://example.com/full-url.jpg)" in content
-        assert "![Inline](https://test.gitbook.io/page/inline.jpg)" in content
\ No newline at end of file
+        assert "![Inline](https://test.gitbook.io/page/inline.jpg)" in content
+
+def test_prefetch_content(scraper, mock_response, sample_content_html):
+    nav_structure = [
+        {
+            'title': 'Page',
+            'url': 'https://test.gitbook.io/page',
+            'level': 1,
+            'children': [
+                {
+                    'title': 'Child',
+                    'url': 'https://test.gitbook.io/child',
+                    'level': 2,
+                    'children': []
+                }
+            ]
+        }
+    ]
+    scraper.delay = 0
+
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(sample_content_html)
+        scraper.prefetch_content(scraper.collect_urls(nav_structure))
+
+        assert mock_get.call_count == 2
+        assert set(scraper.content_cache) == {
+            'https://test.gitbook.io/page',
+            'https://test.gitbook.io/child'
+        }
+
+        content = scraper.generate_markdown(nav_structure)
+        assert mock_get.call_count == 2
+        assert "Sample content paragraph" in content
+
+def test_navigation_extraction_sidebar_fallback(scraper, mock_response):
+    sidebar_html = """
+    <div class="sidebar">
+        <ul>
+            <li><a href="/intro">Introduction</a></li>
+        </ul>
+    </div>
+    """
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(sidebar_html)
+
+        nav = scraper.extract_nav_structure()
+
+        assert len(nav) == 1
+        assert nav[0]['url'] == "https://test.gitbook.io/intro"
+
+def test_connection_pool_sized_for_concurrency():
+    scraper = GitbookScraper("https://test.gitbook.io", concurrency=32)
+    adapter = scraper.session.get_adapter("https://test.gitbook.io")
+    assert adapter._pool_maxsize == 32
+
+def test_navigation_rate_limited(scraper, mock_response):
+    with patch('requests.Session.get') as mock_get, \
+         patch('gitbook_scraper.scraper.time.sleep') as mock_sleep:
+        response = mock_response("", 429)
+        response.headers = {'Retry-After': '7'}
+        mock_get.return_value = response
+
+        with pytest.raises(RateLimitError):
+            scraper.extract_nav_structure()
+
+        assert mock_get.call_count == scraper.retries
+        assert all(call.args[0] == 7.0 for call in mock_sleep.call_args_list)
+
+def test_exponential_backoff(scraper):
+    scraper.delay = 1.0
+    with patch('gitbook_scraper.scraper.time.sleep') as mock_sleep:
+        for attempt in range(3):
+            scraper._sleep_backoff(attempt)
+        waits = [call.args[0] for call in mock_sleep.call_args_list]
+
+    for attempt, wait in enumerate(waits):
+        assert 0.5 * 2 ** attempt <= wait <= 1.5 * 2 ** attempt
+
+def test_content_uses_declared_charset(scraper, mock_response):
+    with patch('requests.Session.get') as mock_get:
+        response = mock_response("")
+        response.content = "<main><p>Привет, мир</p></main>".encode('cp1251')
+        response.headers = {'Content-Type': 'text/html; charset=windows-1251'}
+        mock_get.return_value = response
+
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert "Привет, мир" in content
+
+@pytest.mark.parametrize("use_lxml", [False, pytest.param(True, marks=pytest.mark.skipif(
+    not HAS_LXML, reason="lxml and cssselect are required"))])
+def test_content_charset_without_header(scraper, mock_response, use_lxml):
+    scraper.use_lxml = use_lxml
+    with patch('requests.Session.get') as mock_get:
+        utf8 = mock_response("")
+        utf8.content = "\ufeff<main><p>Café crème</p></main>".encode('utf-8')
+        meta = mock_response("")
+        meta.content = '<meta charset="windows-1251"><main><p>Привет, мир</p></main>'.encode('cp1251')
+        mock_get.side_effect = [utf8, meta]
+
+        assert scraper.fetch_content("https://test.gitbook.io/utf8") == "Café crème"
+        assert scraper.fetch_content("https://test.gitbook.io/meta") == "Привет, мир"
+
+def test_not_modified_served_from_disk_cache(tmp_path, mock_response, sample_content_html):
+    scraper = GitbookScraper("https://test.gitbook.io", cache_dir=str(tmp_path))
+
+    with patch('requests.Session.get') as mock_get:
+        response = mock_response(sample_content_html)
+        response.headers = {'ETag': '"v1"'}
+        mock_get.return_value = response
+        scraper.fetch_content("https://test.gitbook.io/page")
+
+    scraper = GitbookScraper("https://test.gitbook.io", cache_dir=str(tmp_path))
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response("", 304)
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert mock_get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        assert "Sample content paragraph" in content
+
+def test_not_modified_with_missing_body_refetches(tmp_path, mock_response, sample_content_html):
+    scraper = GitbookScraper("https://test.gitbook.io", cache_dir=str(tmp_path))
+
+    with patch('requests.Session.get') as mock_get:
+        response = mock_response(sample_content_html)
+        response.headers = {'ETag': '"v1"'}
+        mock_get.return_value = response
+        scraper.fetch_content("https://test.gitbook.io/page")
+
+    for body_path in tmp_path.glob("*.html"):
+        body_path.unlink()
+
+    scraper = GitbookScraper("https://test.gitbook.io", cache_dir=str(tmp_path))
+    with patch('requests.Session.get') as mock_get:
+        fresh = mock_response(sample_content_html)
+        fresh.headers = {'ETag': '"v2"'}
+        mock_get.side_effect = [mock_response("", 304), fresh]
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert mock_get.call_count == 2
+        assert mock_get.call_args_list[1][1]['headers'] == {}
+        assert "Sample content paragraph" in content
+
+    assert scraper.http_cache.conditional_headers("https://test.gitbook.io/page") == {'If-None-Match': '"v2"'}
+
+def test_deeply_nested_content(scraper, mock_response):
+    html = "<main>" + "<div>" * 1500 + "<p>Deep content</p>" + "</div>" * 1500 + "</main>"
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(html)
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert content == "Deep content"
+
+def test_prefetch_content_with_parse_workers(mock_response, sample_content_html):
+    scraper = GitbookScraper("https://test.gitbook.io", delay=0, parse_workers=2)
+    urls = ["https://test.gitbook.io/page", "https://test.gitbook.io/missing"]
+
+    def get(url, **kwargs):
+        if url.endswith("/missing"):
+            return mock_response("<div>No main content</div>")
+        return mock_response(sample_content_html)
+
+    with patch('requests.Session.get', side_effect=get), \
+         patch('gitbook_scraper.scraper.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+        scraper.prefetch_content(urls)
+
+    assert pool.call_args[1]['mp_context'].get_start_method() == 'spawn'
+    assert "Sample content paragraph" in scraper.content_cache["https://test.gitbook.io/page"]
+    assert scraper.failed_urls == {"https://test.gitbook.io/missing"}
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml and cssselect are required")
+def test_lxml_and_soup_converters_match(mock_response):
+    html = """
+    <main>
+        <h2>Section  title</h2>
+        <p>Text with <b>bold</b>, <a href="/link">a link</a> and <code>code</code><br>after break</p>
+        <div><div><p>Nested <img src="pic.png" alt="Pic"> paragraph</p><span>span</span></div>tail</div>
+        <ul><li>one <em>1</em></li><li>two</li></ul>
+        <ol><li>first</li><li>second</li></ol>
+        <pre><code class="language-python">print("hi")</code></pre>
+        <table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td>2</td></tr></table>
+        <img src="https://example.com/x.png" alt="X">
+        <section><p>In a section</p></section>
+        <script>drop()</script><style>p {}</style><nav>menu</nav>
+    </main>
+    """
+    results = []
+    for use_lxml in (True, False):
+        scraper = GitbookScraper("https://test.gitbook.io")
+        scraper.use_lxml = use_lxml
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value = mock_response(html)
+            results.append(scraper.fetch_content("https://test.gitbook.io/page"))
+
+    assert results[0] == results[1]
+    assert "drop()" not in results[0]
+    assert "menu" not in results[0]
+
+@pytest.mark.parametrize("use_lxml", [False, pytest.param(True, marks=pytest.mark.skipif(
+    not HAS_LXML, reason="lxml and cssselect are required"))])
+def test_content_selector_priority(scraper, mock_response, use_lxml):
+    html = '<div class="content"><p>Wrapper text</p></div><div class="page-inner"><p>Inner text</p></div>'
+    scraper.use_lxml = use_lxml
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(html)
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert content == "Inner text"
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml and cssselect are required")
+def test_streaming_converter_matches_full_parse(mock_response):
+    html = """
+    <nav><a href="/x">menu</a></nav>
+    <div class="content"><p>Wrapper text</p></div>
+    <main>lead<h2>Title</h2>tail<!-- note --><p>Text <a href="/link">link</a></p>
+    <script>drop()</script>after<ul><li>one</li></ul><img src="pic.png" alt="Pic"></main>
+    """
+    results = []
+    for threshold in (1 << 30, 0):
+        scraper = GitbookScraper("https://test.gitbook.io")
+        with patch('gitbook_scraper.scraper.STREAM_PARSE_THRESHOLD', threshold), \
+             patch('requests.Session.get') as mock_get:
+            mock_get.return_value = mock_response(html)
+            results.append(scraper.fetch_content("https://test.gitbook.io/page"))
+
+    assert results[0] == results[1]
+    assert results[1].startswith("lead\n\n## Title")
+    assert "drop()" not in results[1]
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml and cssselect are required")
+def test_streaming_converter_reads_page_encoding(scraper, mock_response):
+    with patch('gitbook_scraper.scraper.STREAM_PARSE_THRESHOLD', 0), \
+         patch('requests.Session.get') as mock_get:
+        declared = mock_response("")
+        declared.content = "<main><p>Привет, мир</p></main>".encode('cp1251')
+        declared.headers = {'Content-Type': 'text/html; charset=windows-1251'}
+        meta = mock_response("")
+        meta.content = '<meta charset="windows-1251"><main><p>Привет, мир</p></main>'.encode('cp1251')
+        mock_get.side_effect = [declared, meta]
+
+        assert scraper.fetch_content("https://test.gitbook.io/declared") == "Привет, мир"
+        assert scraper.fetch_content("https://test.gitbook.io/meta") == "Привет, мир"
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml and cssselect are required")
+@pytest.mark.parametrize("selector", ["div.intro + section", "div.intro ~ section"])
+def test_large_page_sibling_selector(tmp_path, mock_response, selector):
+    selector_file = tmp_path / "selectors.json"
+    selector_file.write_text(json.dumps({"content": [selector]}))
+    scraper = GitbookScraper("https://test.gitbook.io", selector_file=str(selector_file))
+    html = '<div class="intro">Intro</div><section><p>Body</p></section>'
+
+    with patch('gitbook_scraper.scraper.STREAM_PARSE_THRESHOLD', 0), \
+         patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(html)
+        assert scraper.fetch_content("https://test.gitbook.io/page") == "Body"
+
+def test_soupsieve_only_selector_falls_back_to_beautifulsoup(tmp_path, mock_response):
+    selector_file = tmp_path / "selectors.json"
+    selector_file.write_text(json.dumps({
+        "nav": ['div:-soup-contains("Menu")'],
+        "content": ['div:-soup-contains("Docs")']
+    }))
+    scraper = GitbookScraper("https://test.gitbook.io", selector_file=str(selector_file))
+    assert not scraper.use_lxml
+
+    with patch('requests.Session.get') as mock_get:
+        mock_get.side_effect = [
+            mock_response('<div>Menu<ul><li><a href="/intro">Intro</a></li></ul></div>'),
+            mock_response('<div><p>Docs here</p></div>')
+        ]
+        nav = scraper.extract_nav_structure()
+        assert nav[0]['url'] == "https://test.gitbook.io/intro"
+        assert scraper.fetch_content("https://test.gitbook.io/page") == "Docs here"
+
+def test_qualified_nav_selector_uses_strained_parse(tmp_path, mock_response):
+    selector_file = tmp_path / "selectors.json"
+    selector_file.write_text('{"nav": ["nav.docs"]}')
+    scraper = GitbookScraper("https://test.gitbook.io", selector_file=str(selector_file))
+    scraper.use_lxml = False
+    html = """
+    <nav><ul><li><a href="/other">Other</a></li></ul></nav>
+    <nav class="docs"><ul><li><a href="/intro">Introduction</a></li></ul></nav>
+    """
+
+    with patch('requests.Session.get') as mock_get, \
+         patch('gitbook_scraper.scraper.BeautifulSoup', wraps=BeautifulSoup) as mock_soup:
+        mock_get.return_value = mock_response(html)
+        nav = scraper.extract_nav_structure()
+
+        assert [item['title'] for item in nav] == ["Introduction"]
+        assert mock_soup.call_count == 1
+        assert 'parse_only' in mock_soup.call_args.kwargs
+
+@pytest.mark.parametrize("use_lxml", [False, pytest.param(True, marks=pytest.mark.skipif(
+    not HAS_LXML, reason="lxml and cssselect are required"))])
+def test_scripts_stripped_before_parsing(scraper, mock_response, use_lxml):
+    html = """
+    <head><SCRIPT type="application/json">{"html": "<main>Hydration</main>"}</SCRIPT ></head>
+    <!-- <script> left open inside a comment -->
+    <main><p>Real text</p><script src="app.js"></script><p>More text</p></main>
+    """
+    scraper.use_lxml = use_lxml
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(html)
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert content == "Real text\nMore text"
+
+def test_content_blank_lines_collapsed(scraper, mock_response):
+    html = "<main><h2>Heading</h2><p>First   </p><p></p><p>Second</p></main>"
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_response(html)
+        content = scraper.fetch_content("https://test.gitbook.io/page")
+
+        assert content == "## Heading\n\nFirst\nSecond"
+
+def test_scrape_streams_output(tmp_path):
+    output = tmp_path / "docs" / "out.md"
+    scraper = GitbookScraper("https://test.gitbook.io", output_file=str(output))
+    nav_structure = [
+        {'title': 'Intro', 'url': 'https://test.gitbook.io/intro', 'level': 1, 'children': []}
+    ]
+
+    with patch.object(scraper, 'extract_nav_structure', return_value=nav_structure), \
+         patch.object(scraper, 'fetch_content', return_value="Intro content"):
+        scraper.scrape()
+
+    assert output.read_text(encoding='utf-8') == "# Intro\n\nIntro content\n\n\n---\n"
+    assert list(output.parent.iterdir()) == [output]
+
+def test_session_accepts_compressed_responses(scraper):
+    accepted = scraper.session.headers['Accept-Encoding']
+    assert 'gzip' in accepted
+    assert 'deflate' in accepted
+
+@pytest.mark.skipif('br' not in URLLIB3_ACCEPT_ENCODING, reason="urllib3 has no brotli decoder")
+def test_session_accepts_brotli_responses(scraper):
+    assert 'br' in scraper.session.headers['Accept-Encoding'].split(',')